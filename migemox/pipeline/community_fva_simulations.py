@@ -8,16 +8,25 @@ execution of Flux Variability Analysis (FVA) for individual samples.
 """
 
 import cobra
-from cobra.io import load_matlab_model
-from cobra.flux_analysis import flux_variability_analysis
+from cobra.io.mat import from_mat_struct
+from cobra.exceptions import OptimizationError
+from cobra.util.context import get_context
+from cobra.util.solver import check_solver_status
+from optlang.symbolics import Zero
 import numpy as np
 from scipy.io import loadmat, savemat
+from scipy.sparse import csc_matrix, issparse
 import pandas as pd
 from pathlib import Path
 import os
-from concurrent.futures import ProcessPoolExecutor, as_completed
+import re
+import pickle
+from copy import deepcopy
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 from tqdm import tqdm
-from migemox.pipeline.io_utils import make_community_gem_dict
+from migemox.pipeline.io_utils import make_community_gem_dict, cache_path, write_cache, bulk_rename
 from migemox.pipeline.diet_adapter import adapt_vmh_diet_to_agora
 from migemox.pipeline.constraints import apply_couple_constraints
 
@@ -31,8 +40,23 @@ HUMAN_METS = {
     'cspg_d': -1, 'cspg_e': -1, 'hspg': -1
 }
 
-def run_single_fva(sample_name: str, ex_mets: list, model_dir: str, diet_constraints: pd.DataFrame, 
-                   res_path: str, biomass_bounds: tuple, solver: str, humanMets: dict) -> tuple:
+# Bump whenever _load_community_model changes what it pickles, so stale cache entries are not reused
+LOAD_CACHE_VERSION = 1
+
+# Default cap on the FVA threads of a sample: each thread needs its own copy of the community LP,
+# and solvers such as cplex run their own threads as well
+MAX_FVA_THREADS = 4
+
+# Solver interfaces that release the GIL while solving, so threaded FVA runs the chunks concurrently.
+# Others (e.g. glpk) solve one chunk at a time, and every extra thread only adds an LP copy without a warm basis
+CONCURRENT_FVA_SOLVERS = frozenset({'cplex', 'gurobi'})
+
+# Reaction ID prefixes of the diet exchanges and of the transport reactions opened up in the bounds setup
+_RXN_PREFIX_RE = re.compile(r"Diet_EX_|UFEt_|DUt_|EX_")
+
+def run_single_fva(sample_name: str, ex_mets: list, model_dir: str, diet_map: dict, 
+                   res_path: str, biomass_bounds: tuple, solver: str, humanMets: dict,
+                   fva_threads: int = 1, cache_models: bool = False) -> tuple:
     """
     Process individual sample: apply diet, optimize, and run flux variability analysis.
     
@@ -45,13 +69,15 @@ def run_single_fva(sample_name: str, ex_mets: list, model_dir: str, diet_constra
     
     Args:
         sample_name: Sample identifier
-        ex_mets: List of metabolites for exchange analysis
+        ex_mets: Fecal exchange reaction IDs to analyze (a frozenset when called from run_community_fva)
         model_dir: Directory containing community models
-        diet_constraints: DataFrame with diet reaction constraints
+        diet_map: Diet bounds by reaction ID, as built by _diet_bounds_map
         results_path: Directory to save diet-adapted models
         biomass_bounds: Community biomass growth bounds
         solver: Optimization solver (cplex, gurobi, etc.)
         humanMets (dict): Human metabolites dict
+        fva_threads: Number of threads the FVA of this sample is split across
+        cache_models: Reuse/write pickled parses of the loaded .mat models (see _load_community_model)
         
     Returns:
         Tuple of (sample_name, net_production_dict, net_uptake_dict)
@@ -61,83 +87,210 @@ def run_single_fva(sample_name: str, ex_mets: list, model_dir: str, diet_constra
     diet_model_path = os.path.join(diet_model_dir, f"microbiota_model_diet_{sample_name}.mat")
 
     try:
-        if os.path.exists(diet_model_path):
+        diet_model_exists = os.path.exists(diet_model_path)
+        if diet_model_exists:
             print(f"Diet-adapted model for {sample_name} already exists. Skipping steps 1-4, Running FVA directly.")
-            model = load_matlab_model(diet_model_path)
+            model, model_data = _load_community_model(diet_model_path, cache_models)
         else:
             # Step 1: Load and configure sample model
             model_path = os.path.join(model_dir, f"microbiota_model_samp_{sample_name}.mat")
-            model = load_matlab_model(model_path)
-            model_data = loadmat(model_path, simplify_cells=True)['model']
+            model, model_data = _load_community_model(model_path, cache_models)
             model.solver = solver
             model.name = sample_name
+            model = _rename_diet_exchanges(model)
+            rxn_index = _index_reactions(model)
             print(f"Processing {sample_name}: got model")
-            
-            # Step 2: Apply dietary constraints
-            model = _apply_dietary_constraints(model, sample_name, diet_constraints)
-            
-            # Step 3: Set physiological bounds
-            model = _configure_physiological_bounds(model, biomass_bounds, humanMets, diet_constraints) 
-            
-            # Step 4: Optimize and save diet-adapted model
-            diet_model_path = _optimize_and_save_model(model, model_data, sample_name, res_path)
-
-        # Step 5: Perform flux variability analysis
-        net_production_samp, net_uptake_samp, min_net_fecal_excretion, raw_fva_results = _perform_fva(model, ex_mets, sample_name, diet_model_path)
+
+        # Exchange reactions depend only on the model's structure, not on the diet, so they are looked up once
+        fecal_rxns = [r.id for r in model.exchanges]
+
+        # Diet, bounds, coupling constraints and objective are changed inside the model's context,
+        # so they are rolled back on exit and the loaded model can be reused, e.g. for another diet
+        with model:
+            save_future, zobj = None, None
+            if not diet_model_exists:
+                # Step 2: Apply dietary constraints
+                model = _apply_dietary_constraints(model, sample_name, diet_map, rxn_index)
+
+                # Step 3: Set physiological bounds
+                model = _configure_physiological_bounds(model, biomass_bounds, humanMets, diet_map, rxn_index)
+            model = apply_couple_constraints(model, coupling_data=model_data)
+
+            if not diet_model_exists:
+                # Step 4: Optimize and save diet-adapted model (the file is written in the background)
+                save_future, zobj = _optimize_and_save_model(model, model_data, sample_name, res_path)
+
+            # Step 5: Perform flux variability analysis
+            net_production_samp, net_uptake_samp, min_net_fecal_excretion, raw_fva_results = _perform_fva(model, ex_mets, fecal_rxns, sample_name, zobj, fva_threads)
+        if save_future is not None:
+            print(f"  Saved diet-adapted model: {save_future.result()}")
         return sample_name, net_production_samp, net_uptake_samp, min_net_fecal_excretion, raw_fva_results
         
     except Exception as e:
         print(f"Error processing sample {sample_name}: {str(e)}")
         raise e
     
-def _apply_dietary_constraints(model: cobra.Model, sample_name: str, diet_constraints: pd.DataFrame) -> cobra.Model:
-    """Apply diet and host-derived metabolite constraints to model."""
-    diet_rxns = [r.id for r in model.reactions if '[d]' in r.id and r.id.startswith('EX_')]
-    for rxn_id in diet_rxns:
-        new_id = rxn_id.replace('EX_', 'Diet_EX_')
-        if new_id not in model.reactions:
-            model.reactions.get_by_id(rxn_id).id = new_id
+def _load_community_model(model_path: str, use_cache: bool = False) -> tuple:
+    """
+    Parses a community model .mat file once into the cobra model and its coupling data
+    (C, d, dsense, ctrs), instead of reading it with both load_matlab_model and loadmat.
 
-    # First: Set ALL Diet_EX_ reactions to lower bound 0 (like useDiet.m does)
+    With use_cache, the parsed pair is pickled in {model folder}/.cache, so reruns on the same models
+    skip the MATLAB struct conversion. The pickles are about 13x the size of the .mat files, hence
+    opt-in. The cache is invalidated when the .mat file is modified, LOAD_CACHE_VERSION is bumped
+    or cobra/optlang are upgraded.
+
+    Returns:
+        tuple: (cobra model, dict of the coupling data C, d, dsense and ctrs)
+    """
+    if use_cache:
+        path = cache_path(model_path, LOAD_CACHE_VERSION, '.pkl')
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                return pickle.load(f)
+
+    mat_struct = loadmat(model_path)['model']
+    model = from_mat_struct(mat_struct, model_id='model')
+    C = mat_struct['C'][0, 0]
+    model_data = {
+        'C': C if issparse(C) else csc_matrix(C),  # keep coupling sparse even if stored dense
+        'd': mat_struct['d'][0, 0].reshape(-1),
+        'dsense': mat_struct['dsense'][0, 0].reshape(-1),
+        'ctrs': np.array([str(np.squeeze(ctr)) for ctr in mat_struct['ctrs'][0, 0].ravel()], dtype=object)
+    }
+
+    if use_cache:
+        write_cache(path, partial(pickle.dump, (model, model_data), protocol=pickle.HIGHEST_PROTOCOL), binary=True)
+    return model, model_data
+
+def _rename_diet_exchanges(model: cobra.Model) -> cobra.Model:
+    """Rename diet exchange reactions EX_*[d] to Diet_EX_*[d], skipping those whose new ID is already taken."""
+    rxn_ids = set(model.reactions._dict)
+    renames = []
+    for rxn in model.reactions:
+        if rxn.id.startswith('EX_') and rxn.id.endswith('[d]'):
+            new_id = rxn.id.replace('EX_', 'Diet_EX_')
+            if new_id not in rxn_ids:
+                renames.append((rxn, new_id))
+                rxn_ids.add(new_id)
+    bulk_rename(model, renames)
+    return model
+
+def _index_reactions(model: cobra.Model) -> dict:
+    """
+    Build a one-time lookup of the model's reactions, so the bounds setup does not rescan
+    model.reactions for every reaction family it touches.
+
+    Returns:
+        dict with the reactions by ID ('by_id') and lists of the 'Diet_EX_' reactions, the
+        'transport' reactions (UFEt_, DUt_ and EX_), and the demand ('DM') and 'sink' reactions
+    """
+    index = {'by_id': {}, 'Diet_EX_': [], 'transport': [], 'DM': [], 'sink': []}
+    by_id = index['by_id']
+    # Single pass: every reaction is classified by one prefix match and the DM/sink substrings
     for rxn in model.reactions:
-        if rxn.id.startswith('Diet_EX_'):
-            rxn.lower_bound = 0
+        rxn_id = rxn.id
+        by_id[rxn_id] = rxn
+        match = _RXN_PREFIX_RE.match(rxn_id)
+        if match:
+            index['Diet_EX_' if match.group() == 'Diet_EX_' else 'transport'].append(rxn)
+        if '_DM_' in rxn_id:
+            index['DM'].append(rxn)
+        elif '_sink_' in rxn_id:
+            index['sink'].append(rxn)
+    return index
 
-    # Apply diet
-    for _, row in diet_constraints.iterrows():
-        rxn = row['rxn_id']
-        if rxn in model.reactions:
-            model.reactions.get_by_id(rxn).lower_bound = float(row['lower_bound'])
-            if pd.notnull(row['upper_bound']):
-                model.reactions.get_by_id(rxn).upper_bound = float(row['upper_bound'])
+def _set_bounds_in_bulk(reactions: list, lower_bound: float = None, upper_bound: float = None) -> None:
+    """
+    Set the same lower and/or upper bound on many reactions.
+
+    Equivalent to assigning rxn.lower_bound / rxn.upper_bound one reaction at a time, including
+    the bounds check and the revert on leaving a `with model:` block, but the check and the
+    context entry are done once for the whole list instead of through cobra's per-reaction setter.
+    """
+    if not reactions:
+        return
+    old_bounds = [(rxn._lower_bound, rxn._upper_bound) for rxn in reactions]
+    new_bounds = [(lb if lower_bound is None else lower_bound, ub if upper_bound is None else upper_bound)
+                  for lb, ub in old_bounds]
+    invalid = [rxn.id for rxn, (lb, ub) in zip(reactions, new_bounds) if lb > ub]
+    if invalid:
+        raise ValueError(f"The lower bound must be less than or equal to the upper bound for {invalid}")
+
+    context = get_context(reactions[0])
+    if context:
+        context(partial(_write_bounds, reactions, old_bounds))
+    _write_bounds(reactions, new_bounds)
+
+def _write_bounds(reactions: list, bounds: list) -> None:
+    """Writes (lb, ub) pairs to the reactions and their solver variables."""
+    for rxn, (lb, ub) in zip(reactions, bounds):
+        rxn._lower_bound, rxn._upper_bound = lb, ub
+        rxn.update_variable_bounds()
+
+def _diet_bounds_map(diet_constraints: pd.DataFrame) -> dict:
+    """
+    Convert the adapted diet into a plain {rxn_id: (lower_bound, upper_bound)} dict, which is
+    cheap to send to every worker. A missing upper bound is None, meaning the model's current
+    upper bound is kept; for repeated reactions the last row wins, as if applied in order.
+    """
+    diet_map = {}
+    rxn_ids = diet_constraints['rxn_id'].tolist()
+    lbs = diet_constraints['lower_bound'].to_numpy(dtype=float).tolist()
+    ubs = diet_constraints['upper_bound'].to_numpy(dtype=float).tolist()
+    for rxn_id, lb, ub in zip(rxn_ids, lbs, ubs):
+        if np.isnan(ub):
+            ub = diet_map[rxn_id][1] if rxn_id in diet_map else None
+        diet_map[rxn_id] = (lb, ub)
+    return diet_map
+
+def _apply_dietary_constraints(model: cobra.Model, sample_name: str, diet_map: dict,
+                               rxn_index: dict) -> cobra.Model:
+    """Apply diet and host-derived metabolite constraints to model."""
+    # First: Set ALL Diet_EX_ reactions to lower bound 0 (like useDiet.m does)
+    _set_bounds_in_bulk(rxn_index['Diet_EX_'], lower_bound=0)
+
+    # Apply diet, one bounds assignment per reaction (a missing upper bound keeps the current one)
+    rxn_by_id = rxn_index['by_id']
+    for rxn_id, (lb, ub) in diet_map.items():
+        rxn = rxn_by_id.get(rxn_id)
+        if rxn is not None:
+            rxn.bounds = (lb, rxn.upper_bound if ub is None else ub)
 
     print(f"Processing {sample_name}: diet applied")
     return model
 
-def _configure_physiological_bounds(model: cobra.Model, biomass_bounds: tuple, humanMets: dict, diet_constraints: pd.DataFrame) -> cobra.Model:
+def _configure_physiological_bounds(model: cobra.Model, biomass_bounds: tuple, humanMets: dict,
+                                    diet_map: dict, rxn_index: dict) -> cobra.Model:
     """Set physiologically realistic bounds on transport and biomass reactions."""
+    rxn_by_id = rxn_index['by_id']
+
     # Constrain community biomass growth
-    if 'communityBiomass' in model.reactions:
-        model.reactions.communityBiomass.bounds = biomass_bounds
+    if 'communityBiomass' in rxn_by_id:
+        rxn_by_id['communityBiomass'].bounds = biomass_bounds
 
-    for rxn in model.reactions:
-        if rxn.id.startswith('UFEt_') or rxn.id.startswith('DUt_') or rxn.id.startswith('EX_'):
-            rxn.upper_bound = 1e6
+    _set_bounds_in_bulk(rxn_index['transport'], upper_bound=1e6)
 
     # Change the bound of the humanMets if not included in the diet BUT it is in the existing model's reactions
     for met_id, bound in humanMets.items():
         rxn_id = f'Diet_EX_{met_id}[d]'
-        if rxn_id not in diet_constraints['rxn_id'].values and rxn_id in model.reactions:
-            model.reactions.get_by_id(rxn_id).bounds = bound, 10000.
+        if rxn_id not in diet_map and rxn_id in rxn_by_id:
+            rxn_by_id[rxn_id].bounds = bound, 10000.
 
     # close demand and limit sink reactions
-    for rxn in model.reactions:
-        if '_DM_' in rxn.id: rxn.lower_bound = 0
-        elif '_sink_' in rxn.id: rxn.lower_bound = -1
+    _set_bounds_in_bulk(rxn_index['DM'], lower_bound=0)
+    _set_bounds_in_bulk(rxn_index['sink'], lower_bound=-1)
     return model
 
-def _optimize_and_save_model(model: cobra.Model, model_data: dict, sample_name: str, results_path: str) -> None:
-    """Optimize model and save diet-adapted version."""
+def _optimize_and_save_model(model: cobra.Model, model_data: dict, sample_name: str, results_path: str) -> tuple:
+    """
+    Optimize model and save diet-adapted version.
+
+    The model is converted to its .mat dict right away, but the compressed savemat runs on a
+    background thread so that FVA can start meanwhile. Returns the Future of the save, whose
+    result is the path of the saved model, and the optimal objective value so that FVA does
+    not have to solve the same FBA again.
+    """
     # Set objective to community biomass export & Optimize to ensure feasibility
     model.objective = 'EX_microbeBiomass[fe]'
     solution = model.optimize()
@@ -153,71 +306,170 @@ def _optimize_and_save_model(model: cobra.Model, model_data: dict, sample_name:
     
     # Save diet-adapted model
     save_path = os.path.join(diet_model_dir, f"microbiota_model_diet_{sample_name}.mat")
+    save_executor = ThreadPoolExecutor(max_workers=1)
+    save_future = save_executor.submit(_save_model_dict, save_path, model_dict)
+    save_executor.shutdown(wait=False)
+    zobj = solution.objective_value if solution.status == 'optimal' else None
+    return save_future, zobj
+
+def _save_model_dict(save_path: str, model_dict: dict) -> str:
+    """Writes a community model dict to a compressed .mat file and returns its path."""
     savemat(save_path, {'model': model_dict}, do_compression=True, oned_as='column')
-    print(f"  Saved diet-adapted model: {save_path}")
     return save_path
 
-def _perform_fva(model: cobra.Model, exchanges: list, sample_name: str, diet_model_path: str) -> tuple:
-    """Perform flux variability analysis and calculate net metabolite fluxes."""
-    print(f"  Starting FVA for {sample_name}")
-    
-    # Get reaction indices for FVA
-    # fecal_rxn_ids = [model.reactions.index(rxn) for rxn in model.exchanges]
+def _run_fva(model: cobra.Model, rxn_ids: list, fraction_of_optimum: float = 0.9999, threads: int = 1,
+             objective_value: float = None) -> tuple:
+    """
+    Flux variability analysis on a single persistent LP.
 
-    # diet_rxn_ids = [rxn.id.replace('EX_', 'Diet_EX_').replace('[fe]', '[d]') for rxn in model.exchanges]
-    # diet_rxn_ids = [model.reactions.index(model.reactions.get_by_id(rid)) for rid in diet_rxn_ids if rid in model.reactions]
-    
-    # A, rhs, csense, lb, ub, c = build_constraint_matrix(diet_model_path)
-    # opt_model, vars, obj_expr = build_optlang_model(A, rhs, csense, lb, ub, c)
-    # min_flux_fecal, max_flux_fecal = run_sequential_fva(opt_model, vars, obj_expr, fecal_rxn_ids, opt_percentage=99.99)
-    # min_flux_diet, max_flux_diet = run_sequential_fva(opt_model, vars, obj_expr, diet_rxn_ids, opt_percentage=99.99)
-
-    model = apply_couple_constraints(model, diet_model_path)
-    fecal_result = flux_variability_analysis(model, 
-                                            reaction_list=[rxn for rxn in model.exchanges],
-                                            fraction_of_optimum=0.9999, processes=4)
-    diet_result = flux_variability_analysis(model, 
-                                            reaction_list=[rxn for rxn in model.reactions if 'Diet_EX_' in rxn.id],
-                                            fraction_of_optimum=0.9999, processes=4)
-    
-    min_flux_fecal, max_flux_fecal = fecal_result['minimum'].to_dict(), fecal_result['maximum'].to_dict()
-    min_flux_diet, max_flux_diet = diet_result['minimum'].to_dict(), diet_result['maximum'].to_dict()
+    The optimum of the current objective is fixed as a constraint at fraction_of_optimum of
+    its value; it is solved here only when objective_value is not already known. For each
+    reaction only the objective coefficients are then swapped on the same solver problem, so
+    every solve warm-starts from the previous basis. All reactions are minimized first and then
+    maximized, as in cobra's flux_variability_analysis, but without re-solving the FBA.
 
-    # Calculate net production and uptake
-    net_production_samp, net_uptake_samp, min_net_fecal_excretion, raw_fva_results = {}, {}, {}, {}
+    With threads > 1 the reactions are split into contiguous chunks that are solved in a thread
+    pool, each on its own in-memory copy of the solver problem. Nothing is pickled to other
+    processes, and solvers that release the GIL (e.g. cplex) solve the chunks concurrently.
+
+    Args:
+        model: Model with its objective set and all constraints applied
+        rxn_ids: IDs of the reactions to analyze
+        fraction_of_optimum: Fraction of the optimal objective that must be maintained
+        threads: Number of threads to split the reactions across
+        objective_value: Optimum of the current objective on this exact model, if already solved
+
+    Returns:
+        Tuple of (min_flux, max_flux) dicts keyed by reaction ID
+
+    Raises:
+        OptimizationError: If a reaction's LP is not solved to optimality, as in cobra's FVA
+    """
+    with model:
+        optimum = objective_value
+        if optimum is None:
+            optimum = model.slim_optimize(error_value=None,
+                                          message="There is no optimal solution for the chosen objective!")
+        if model.solver.objective.direction == "max":
+            optimum_constraint = model.problem.Constraint(model.solver.objective.expression,
+                                                          lb=fraction_of_optimum * optimum)
+        else:
+            optimum_constraint = model.problem.Constraint(model.solver.objective.expression,
+                                                          ub=fraction_of_optimum * optimum)
+        model.add_cons_vars([optimum_constraint])
+        model.objective = Zero
+        model.solver.update()
+
+        # Solver variables of each reaction, by name so that they can be looked up on any copy of the LP
+        variables = [(rxn.id, rxn.forward_variable.name, rxn.reverse_variable.name)
+                     for rxn in (model.reactions.get_by_id(rid) for rid in rxn_ids)]
+
+        threads = min(threads, len(variables))
+        if threads <= 1:
+            return _fva_on_lp(model.solver, variables)
+
+        chunk_size = -(-len(variables) // threads)
+        chunks = [variables[i:i + chunk_size] for i in range(0, len(variables), chunk_size)]
+        try:
+            lps = [model.solver] + [deepcopy(model.solver) for _ in chunks[1:]]
+        except Exception as e:
+            # Threads must never share one LP, so without copies all chunks are solved on the model's own
+            print(f"  ⚠️ Could not copy the solver problem for threaded FVA ({e}), solving sequentially")
+            return _fva_on_lp(model.solver, variables)
+        min_flux, max_flux = {}, {}
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            for chunk_min, chunk_max in executor.map(_fva_on_lp, lps, chunks):
+                min_flux.update(chunk_min)
+                max_flux.update(chunk_max)
+    return min_flux, max_flux
+
+def _fva_on_lp(lp, variables: list) -> tuple:
+    """
+    Minimizes, then maximizes each reaction on an LP prepared by _run_fva (optimum fixed, zero objective).
+
+    Args:
+        lp: optlang model to solve on
+        variables: (reaction ID, forward variable name, reverse variable name) per reaction
+
+    Returns:
+        Tuple of (min_flux, max_flux) dicts keyed by reaction ID (NaN if the solver returns no value)
+
+    Raises:
+        OptimizationError: If a solve ends with a non-optimal status, like cobra's _fva_step
+    """
+    pairs = [(rxn_id, lp.variables[fwd], lp.variables[rev]) for rxn_id, fwd, rev in variables]
+    min_flux, max_flux = {}, {}
+    for direction, fluxes in (("min", min_flux), ("max", max_flux)):
+        lp.objective.direction = direction
+        for rxn_id, forward_variable, reverse_variable in pairs:
+            lp.objective.set_linear_coefficients({forward_variable: 1, reverse_variable: -1})
+            lp.optimize()
+            try:
+                check_solver_status(lp.status)
+            except OptimizationError as e:
+                raise OptimizationError(f"FVA ({direction}) of {rxn_id} failed: {e}") from e
+            value = lp.objective.value
+            fluxes[rxn_id] = float("nan") if value is None else value
+            lp.objective.set_linear_coefficients({forward_variable: 0, reverse_variable: 0})
+    return min_flux, max_flux
+
+def _perform_fva(model: cobra.Model, exchanges: list, fecal_rxns: list, sample_name: str,
+                 objective_value: float = None, fva_threads: int = 1) -> tuple:
+    """Perform flux variability analysis and calculate net metabolite fluxes (fecal_rxns: IDs of model.exchanges)."""
+    print(f"  Starting FVA for {sample_name}")
 
     # exchanges derived from exMets (all exchanged metabolites across all individual models) -> intersect it with rxns in this particular model
-    fecal_rxns = [r.id for r in model.exchanges]
-    exchanges = set(fecal_rxns).intersection(set(exchanges))
+    exchanges = frozenset(exchanges).intersection(fecal_rxns)
 
-    # cut off very small values below solver sensitivity
-    tol = 1e-07
-    for rxn in exchanges:
-        fecal_var = rxn
-        diet_var = rxn.replace('EX_', 'Diet_EX_').replace('[fe]', '[d]')
+    # Only these fecal exchanges and their paired diet reactions are used below, so FVA is
+    # restricted to them and both sets are solved together on one persistent LP
+    fecal_rxn_ids = list(exchanges)
+    paired_diet_ids = [r.replace('EX_', 'Diet_EX_').replace('[fe]', '[d]') for r in fecal_rxn_ids]
+    diet_rxn_ids = [rid for rid in paired_diet_ids if rid in model.reactions]
+    min_flux, max_flux = _run_fva(model, fecal_rxn_ids + diet_rxn_ids, fraction_of_optimum=0.9999,
+                                  threads=fva_threads, objective_value=objective_value)
+    failed = sorted(rid for rid in min_flux if np.isnan(min_flux[rid]) or np.isnan(max_flux[rid]))
+    if failed:
+        print(f"  ⚠️ Warning: FVA returned no flux for {len(failed)} reactions of {sample_name} (NaN): {failed}")
 
-        if abs(max_flux_fecal.get(fecal_var, 0)) < tol: max_flux_fecal.get(fecal_var, 0) == 0
+    # Align the four flux vectors on the fecal exchanges, as the rows of one array; a diet reaction
+    # missing from the model counts as 0
+    min_flux, max_flux = pd.Series(min_flux, dtype=float), pd.Series(max_flux, dtype=float)
+    fluxes = np.vstack([
+        min_flux.reindex(paired_diet_ids, fill_value=0).to_numpy(),
+        max_flux.reindex(paired_diet_ids, fill_value=0).to_numpy(),
+        min_flux.reindex(fecal_rxn_ids, fill_value=0).to_numpy(),
+        max_flux.reindex(fecal_rxn_ids, fill_value=0).to_numpy(),
+    ])
 
-        prod = abs(min_flux_diet.get(diet_var, 0) + max_flux_fecal.get(fecal_var, 0))
-        uptk = abs(max_flux_diet.get(diet_var, 0) + min_flux_fecal.get(fecal_var, 0))
-        min_net_fe_ex = min_flux_fecal.get(fecal_var, 0) + min_flux_diet.get(diet_var, 0)
-    
-        net_production_samp[rxn] = prod
-        net_uptake_samp[rxn] = uptk
-        min_net_fecal_excretion[rxn] = min_net_fe_ex
-        raw_fva_results[rxn] = {
-            'min_flux_diet': min_flux_diet.get(diet_var, 0),
-            'max_flux_diet': max_flux_diet.get(diet_var, 0),
-            'min_flux_fecal': min_flux_fecal.get(fecal_var, 0),
-            'max_flux_fecal': max_flux_fecal.get(fecal_var, 0)
-        }
+    # cut off very small values below solver sensitivity, for all four vectors in a single pass
+    tol = 1e-07
+    fluxes = np.where(np.abs(fluxes) < tol, 0.0, fluxes)
+    min_flux_diet, max_flux_diet, min_flux_fecal, max_flux_fecal = fluxes
+
+    # Calculate net production and uptake
+    net_production_samp = dict(zip(fecal_rxn_ids, np.abs(min_flux_diet + max_flux_fecal).tolist()))
+    net_uptake_samp = dict(zip(fecal_rxn_ids, np.abs(max_flux_diet + min_flux_fecal).tolist()))
+    min_net_fecal_excretion = dict(zip(fecal_rxn_ids, (min_flux_fecal + min_flux_diet).tolist()))
+    raw_fva_results = {
+        rxn: {'min_flux_diet': min_d, 'max_flux_diet': max_d, 'min_flux_fecal': min_f, 'max_flux_fecal': max_f}
+        for rxn, min_d, max_d, min_f, max_f in zip(fecal_rxn_ids, min_flux_diet.tolist(), max_flux_diet.tolist(),
+                                                  min_flux_fecal.tolist(), max_flux_fecal.tolist())
+    }
     
     print(f"  Completed FVA analysis for {sample_name}")
     return net_production_samp, net_uptake_samp, min_net_fecal_excretion, raw_fva_results
 
+def _available_cpus() -> int:
+    """CPUs this process may run on (respects affinity masks such as container CPU sets where supported)."""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
 def run_community_fva(
     sample_names: list, ex_mets: list, model_dir: str, diet_file: str, res_path: str,
-    biomass_bounds: tuple=(0.4, 1.0), solver: str = 'cplex', workers: int = 1) -> tuple:
+    biomass_bounds: tuple=(0.4, 1.0), solver: str = 'cplex', workers: int = 1, fva_threads: int = None,
+    cache_models: bool = False) -> tuple:
     """
     Apply dietary constraints and perform flux variability analysis on community models.
     
@@ -234,34 +486,54 @@ def run_community_fva(
         biomass_bounds: Community biomass bounds
         solver: Optimization solver name
         workers: Number of parallel workers
+        fva_threads: Threads per sample FVA. Defaults to 1, except for a single worker with a solver in
+            CONCURRENT_FVA_SOLVERS, where it defaults to the available CPUs capped at MAX_FVA_THREADS
+        cache_models: Pickle the parsed sample and diet models next to them, so reruns load faster
         
     Returns:
-        Tuple of (exchange_reactions, net_production_dict, net_uptake_dict, min_net_fecal_excretion, raw_fva_results)
+        Tuple of (exchange_reactions, net_production_dict, net_uptake_dict, min_net_fecal_excretion, raw_fva_path)
+
+    The raw FVA fluxes are not kept in memory: each sample's are appended to
+    inputDiet_raw_fva_results.csv in res_path as soon as the sample finishes.
     """
     os.makedirs(res_path, exist_ok=True)
     exchanges = [f"EX_{m.replace('[e]', '[fe]')}" for m in ex_mets if m != 'biomass[e]']
+    # Built once and shared by all samples, each of which only intersects it with its own exchanges
+    exchanges_set = frozenset(exchanges)
 
     net_production = {}
     net_uptake = {}
     min_net_fecal_excretion = {}
-    raw_fva_results = {}
+
+    raw_fva_path = os.path.join(res_path, 'inputDiet_raw_fva_results.csv')
+    raw_fva_columns = ['min_flux_diet', 'max_flux_diet', 'min_flux_fecal', 'max_flux_fecal']
+    with open(raw_fva_path, 'w') as f:
+        f.write(','.join(['Sample', 'Reaction'] + raw_fva_columns) + '\n')
 
     # Adapt diet
     diet_constraints = adapt_vmh_diet_to_agora(diet_file, setup_type='Microbiota')
+    diet_map = _diet_bounds_map(diet_constraints)
+
+    # Parallelize either across samples or within each sample's FVA, never both, so that
+    # nested pools do not oversubscribe the CPUs (workers x FVA threads)
+    if fva_threads is None:
+        concurrent = workers == 1 and solver in CONCURRENT_FVA_SOLVERS
+        fva_threads = min(MAX_FVA_THREADS, _available_cpus()) if concurrent else 1
 
     print("Got constraints, starting parallel processing")
 
     # Use ProcessPoolExecutor for parallel processing
+    failed_samples = []
     with ProcessPoolExecutor(max_workers=workers) as executor:
         # Submit all sample processing jobs
-        futures = [
+        futures = {
             executor.submit(
                 run_single_fva, 
-                samp, exchanges, model_dir, diet_constraints, res_path,
-                biomass_bounds, solver, HUMAN_METS
-            ) 
+                samp, exchanges_set, model_dir, diet_map, res_path,
+                biomass_bounds, solver, HUMAN_METS, fva_threads, cache_models
+            ): samp
             for samp in sample_names
-        ]
+        }
         
         # Collect results as they complete
         for future in tqdm(as_completed(futures), total=len(futures), desc='Processing samples'):
@@ -270,12 +542,24 @@ def run_community_fva(
                 net_production[sample_name] = net_production_samp
                 net_uptake[sample_name] = net_uptake_samp
                 min_net_fecal_excretion[sample_name] = min_net_fe_ex
-                raw_fva_results[sample_name] = raw_fva
+
+                # Stream the raw fluxes to disk instead of holding every sample's in memory
+                raw_fva_df = pd.DataFrame.from_dict(raw_fva, orient='index', columns=raw_fva_columns)
+                raw_fva_df.index = pd.MultiIndex.from_product([[sample_name], raw_fva_df.index])
+                raw_fva_df.to_csv(raw_fva_path, mode='a', header=False)
+                del raw_fva, raw_fva_df
                 
+            except BrokenProcessPool:
+                # The workers themselves died (e.g. could not start), so no other sample can succeed either
+                raise
             except Exception as e:
-                print(f"Sample {sample_name} failed with error: {e}")
+                print(f"Sample {futures[future]} failed with error: {e}")
+                failed_samples.append(futures[future])
                 # Continue processing other samples
                 continue
 
-    print("All samples processed successfully")
-    return exchanges, net_production, net_uptake, min_net_fecal_excretion, raw_fva_results
\ No newline at end of file
+    if failed_samples:
+        print(f"⚠️ {len(failed_samples)} of {len(sample_names)} samples failed: {', '.join(failed_samples)}")
+    else:
+        print("All samples processed successfully")
+    return exchanges, net_production, net_uptake, min_net_fecal_excretion, raw_fva_path
\ No newline at end of file
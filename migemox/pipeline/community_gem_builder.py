@@ -11,12 +11,17 @@ based on sample-specific abundances.
 import cobra
 from cobra import Reaction, Metabolite
 from scipy.io import savemat
+import numpy as np
 import pandas as pd
 import os
 import re
+import json
+from typing import Optional
 from migemox.pipeline.constraints import build_global_coupling_constraints, prune_coupling_constraints_by_microbe
-from migemox.pipeline.io_utils import make_community_gem_dict
-from concurrent.futures import ProcessPoolExecutor
+from migemox.pipeline.io_utils import make_community_gem_dict, cache_path, write_cache, bulk_rename
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import nullcontext
+from itertools import repeat
 from tqdm import tqdm
 
 # Metabolite exchange bounds (mmol/gDW/h)
@@ -28,6 +33,16 @@ TRANSPORT_BOUNDS = (0.0, 10000.0) # Unidirectional transport
 # microbe inclusion threshold
 ABUNDANCE_THRESHOLD = 1e-7
 
+# Bump whenever reformat_gem_for_community changes its output, so stale cache entries are not reused
+REFORMAT_CACHE_VERSION = 2
+
+# Compartment suffix of single-cell AGORA metabolite IDs, e.g. glc_D[e]
+_COMPARTMENT_RE = re.compile(r"\[(c|p|e)\]$")
+
+# Per-process state of community_gem_builder workers, set once by _init_worker
+_worker_global_model = None
+_worker_coupling = None
+
 def create_rxn(rxn_identifier: str, name: str, subsystem: str, bounds: tuple) -> cobra.Reaction:
     """
     Create a COBRA reaction with specified bounds and metadata.
@@ -49,6 +64,13 @@ def create_rxn(rxn_identifier: str, name: str, subsystem: str, bounds: tuple) ->
     rxn.upper_bound = ub
     return rxn
 
+def _id_set(dictlist: cobra.DictList) -> set:
+    """
+    Returns the IDs of a cobra DictList as a set, read straight from its index instead of
+    touching every object. The set is a snapshot: callers adding objects keep it up to date.
+    """
+    return set(dictlist._dict.keys())
+
 def add_diet_fecal_compartments(model: cobra.Model) -> cobra.Model:
     """
     Add diet and fecal compartments to community model for host interaction.
@@ -80,63 +102,89 @@ def add_diet_fecal_compartments(model: cobra.Model) -> cobra.Model:
     """
     # Delete all EX_ reaction artifacts from the single cell models
     # E.g., EX_dad_2(e): dad_2[e] <=>, EX_thymd(e): thymd[e] <=>
-    to_remove = [r for r in model.reactions if "_EX_" in r.id or "(e)" in r.id]
+    to_remove = [r for r in model.reactions
+                 if r.id.startswith("EX_") or r.id.endswith("(e)") or "_EX_" in r.id]
     model.remove_reactions(to_remove)
 
     # Create the diet and fecal compartments for reactions and metabolites
-    # Get all of our general extracellular metabolites
-    general_mets = []
-    for reac in model.reactions:
-        if "IEX" in reac.id:
-            iex_reac = model.reactions.get_by_id(reac.id)
-            # Pick only general (unlabeled) metabolites on the LHS
-            for met in iex_reac.reactants:
-                if "[u]" in met.id:
-                    general_mets.append(met.id)
-    general_mets = set(general_mets)
+    # Get all of our general extracellular metabolites: the general (unlabeled)
+    # lumen metabolites on the LHS of IEX reactions
+    reactions = model.reactions
+    general_mets = {
+        met.id
+        for reac in reactions
+        if "_IEX_" in reac.id
+        for met in reac.reactants
+        if met.id.endswith("[u]")
+    }
 
     # Create diet and fecal compartments, with new transport and exchange reactions
-    existing_mets = {m.id for m in model.metabolites}
-    existing_rxns = {r.id for r in model.reactions}
-    
+    # Reactions and metabolites are staged first and added to the model in one batch each
+    existing_mets = _id_set(model.metabolites)
+    existing_rxns = _id_set(model.reactions)
+    mets_by_id = {m.id: m for m in model.metabolites}
+    new_rxns, new_mets = [], []
+
     for lumen_met in general_mets:
         base_name = lumen_met.split('[')[0]  # Remove [u] suffix
-
-        # EX_2omxyl[d]: 2omxyl[d] <=>
-        _add_exchange_reaction(base_name, existing_mets, model, EXCHANGE_BOUNDS, "d", "diet")
-        # DUt_4hbz: 4hbz[d] --> 4hbz[u]
-        _add_transport_reaction(f'DUt_{base_name}', existing_rxns, model, f'{base_name}[d]', lumen_met, TRANSPORT_BOUNDS, "diet to lumen")
-        # EX_4abut[fe]: 4abut[fe] <=>
-        _add_exchange_reaction(base_name, existing_mets, model, EXCHANGE_BOUNDS, "fe", "fecal")
-        # UFEt_arabinoxyl: arabinoxyl[u] --> arabinoxyl[fe]
-        _add_transport_reaction(f'UFEt_{base_name}', existing_rxns, model, lumen_met, f'{base_name}[fe]', TRANSPORT_BOUNDS, "lumen to fecal")
+        diet_met, fecal_met = f'{base_name}[d]', f'{base_name}[fe]'
+        staged = (
+            # EX_2omxyl[d]: 2omxyl[d] <=>
+            (_build_exchange_reaction(base_name, existing_mets, existing_rxns, EXCHANGE_BOUNDS, "d", "diet"),
+             {diet_met: -1}),
+            # DUt_4hbz: 4hbz[d] --> 4hbz[u]
+            (_build_transport_reaction(f'DUt_{base_name}', existing_rxns, TRANSPORT_BOUNDS, "diet to lumen"),
+             {diet_met: -1, lumen_met: 1}),
+            # EX_4abut[fe]: 4abut[fe] <=>
+            (_build_exchange_reaction(base_name, existing_mets, existing_rxns, EXCHANGE_BOUNDS, "fe", "fecal"),
+             {fecal_met: -1}),
+            # UFEt_arabinoxyl: arabinoxyl[u] --> arabinoxyl[fe]
+            (_build_transport_reaction(f'UFEt_{base_name}', existing_rxns, TRANSPORT_BOUNDS, "lumen to fecal"),
+             {lumen_met: -1, fecal_met: 1}),
+        )
+        for (reaction, metabolite), stoichiometry in staged:
+            if reaction is None:
+                continue
+            if metabolite is not None:
+                new_mets.append(metabolite)
+                mets_by_id[metabolite.id] = metabolite
+            # Assign stoichiometry with metabolite objects directly, no reaction string parsing
+            reaction.add_metabolites({mets_by_id[met_id]: coeff for met_id, coeff in stoichiometry.items()})
+            new_rxns.append(reaction)
+
+    model.add_metabolites(new_mets)
+    model.add_reactions(new_rxns)
 
     return model
 
-def _add_exchange_reaction(base_name: str, existing_met_ids: set, model: cobra.Model, bounds: tuple, compartment: str, label: str):
+def _build_exchange_reaction(base_name: str, existing_met_ids: set, existing_rxn_ids: set, bounds: tuple,
+                             compartment: str, label: str) -> tuple[Optional[Reaction], Optional[Metabolite]]:
     """
-    Helper function to add an exchange reaction and its associated metabolite to the model.
+    Helper function to build an exchange reaction and its associated metabolite without
+    touching the model. Returns (None, None) if the metabolite already exists, otherwise
+    registers the new IDs in the given sets.
     """
     met_id = f'{base_name}[{compartment}]'
-    if met_id not in existing_met_ids:
-        reac_id = "EX_" + met_id
-        reaction = create_rxn(reac_id, f"{met_id} {label} exchange", ' ', bounds)
-        model.add_reactions([reaction])
-        model.add_metabolites([Metabolite(met_id, compartment=compartment)])
-        reaction = model.reactions.get_by_id(reac_id)
-        reaction.add_metabolites({model.metabolites.get_by_id(met_id): -1})
-
-def _add_transport_reaction(rxn_id: str, existing_rxn_ids: set, model: cobra.Model, reactant_id: str, product_id: str, bounds: tuple, label: str):
+    if met_id in existing_met_ids:
+        return None, None
+    reac_id = "EX_" + met_id
+    existing_met_ids.add(met_id)
+    existing_rxn_ids.add(reac_id)
+    reaction = create_rxn(reac_id, f"{met_id} {label} exchange", ' ', bounds)
+    return reaction, Metabolite(met_id, compartment=compartment)
+
+def _build_transport_reaction(rxn_id: str, existing_rxn_ids: set, bounds: tuple,
+                              label: str) -> tuple[Optional[Reaction], None]:
     """
-    Helper function to add a transport reaction between two metabolites.
+    Helper function to build a transport reaction between two metabolites without
+    touching the model. Returns (None, None) if the reaction already exists.
     """
-    if rxn_id not in existing_rxn_ids:
-        reaction = create_rxn(rxn_id, f"{rxn_id} {label} transport", ' ', bounds)
-        model.add_reactions([reaction])
-        reaction.reaction = f"{reactant_id} --> {product_id}"
-        reaction.bounds = bounds
+    if rxn_id in existing_rxn_ids:
+        return None, None
+    existing_rxn_ids.add(rxn_id)
+    return create_rxn(rxn_id, f"{rxn_id} {label} transport", ' ', bounds), None
 
-def com_biomass(model: cobra.Model, abun_path: str, sample_com: str) -> cobra.Model:
+def com_biomass(model: cobra.Model, abun_df: pd.DataFrame, sample_com: str) -> cobra.Model:
     """
     Create weighted community biomass reaction based on microbe abundances.
     
@@ -148,20 +196,22 @@ def com_biomass(model: cobra.Model, abun_path: str, sample_com: str) -> cobra.Mo
     
     Args:
         model: Community model with individual microbe biomass reactions
-        abundance_path: Path to microbe abundance CSV file
-        sample_name: Column name in abundance file for this sample
+        abun_df: Abundance table with microbe names in column 'X' and one column per sample
+        sample_com: Column name in abun_df for this sample
         
     Returns:
         Model with community biomass reaction and transport to fecal compartment
     """
 
     # Deleting all previous community biomass equations
-    biomass_reactions = [r for r in model.reactions if "Biomass" in r.id]
+    biomass_reactions = [r for r in model.reactions
+                         if r.id.endswith(("Biomass", "Biomass[fe]")) or r.id.startswith("Biomass")]
     model.remove_reactions(biomass_reactions)
 
-    # Load abundance data and filter by threshold
-    abun_df = pd.read_csv(abun_path)
-    abun_df = abun_df[abun_df[sample_com] > ABUNDANCE_THRESHOLD]
+    # Filter abundance data by threshold
+    mask = abun_df[sample_com] > ABUNDANCE_THRESHOLD
+    names = abun_df.loc[mask, "X"].to_numpy()
+    abundances = abun_df.loc[mask, sample_com].to_numpy(dtype=float)
 
     # Creating the community biomass reaction
     reaction = create_rxn("communityBiomass", "communityBiomass", ' ', (0., 10000.))
@@ -169,17 +219,17 @@ def com_biomass(model: cobra.Model, abun_path: str, sample_com: str) -> cobra.Mo
     community_biomass = model.reactions.communityBiomass
 
     # Build abundance-weighted biomass stoichiometry
-    biomass_stoichiometry = {}
-    
-    for _, row in abun_df.iterrows():
-        microbe_name = row["X"]
-        abundance = float(row[sample_com])
-        biomass_met_id = f"{microbe_name}_biomass[c]"
-        if biomass_met_id in model.metabolites:
-            biomass_stoichiometry[biomass_met_id] = -abundance
-        else:
-            print(f"⚠️ Biomass metabolite missing in model: {biomass_met_id}")
-    
+    biomass_met_ids = np.char.add(names.astype(str), "_biomass[c]").tolist()
+    present_met_ids = _id_set(model.metabolites)
+    biomass_stoichiometry = {
+        met_id: -abundance
+        for met_id, abundance in zip(biomass_met_ids, abundances.tolist())
+        if met_id in present_met_ids
+    }
+    for met_id in biomass_met_ids:
+        if met_id not in present_met_ids:
+            print(f"⚠️ Biomass metabolite missing in model: {met_id}")
+
     community_biomass.add_metabolites(metabolites_to_add=biomass_stoichiometry, combine=True)
 
     # Adding the microbeBiomass metabolite
@@ -196,22 +246,14 @@ def com_biomass(model: cobra.Model, abun_path: str, sample_com: str) -> cobra.Mo
     new_fe_react = model.reactions.get_by_id("EX_microbeBiomass[fe]")
     new_fe_react.add_metabolites({model.metabolites.get_by_id("microbeBiomass[fe]"): -1})
 
-    # Adding the UFEt reaction
+    # Adding the UFEt reaction: microbeBiomass[u] --> microbeBiomass[fe]
     reaction = create_rxn("UFEt_microbeBiomass", "UFEt_microbeBiomass", ' ', TRANSPORT_BOUNDS)
+    reaction.add_metabolites({model.metabolites.get_by_id("microbeBiomass[u]"): -1,
+                              model.metabolites.get_by_id("microbeBiomass[fe]"): 1})
     model.add_reactions([reaction])
-    reaction.reaction = "microbeBiomass[u] --> microbeBiomass[fe]"
-    reaction.bounds = TRANSPORT_BOUNDS
 
     return model
 
-def tag_metabolite(met: cobra.Metabolite, microbe_name: str, compartment: str):
-    '''
-    Helper function for microbe_to_community for tagging metabolites
-    '''
-    met.compartment = compartment
-    no_c_name = met.id.replace(f"[{compartment}]", "")
-    met.id = f'{microbe_name}_{no_c_name}[{compartment}]'
-
 def reformat_gem_for_community(model: cobra.Model, microbe_model_name: str):
     """
     Takes a single cell AGORA GEM and changes its reaction and metabolite formatting so it 
@@ -239,32 +281,32 @@ def reformat_gem_for_community(model: cobra.Model, microbe_model_name: str):
 
     # Extracting the microbe name from the microbe model name
     short_microbe_name = os.path.splitext(os.path.basename(microbe_model_name))[0]
+    microbe_prefix = f"{short_microbe_name}_"
 
     # Step 1: Remove all exchange reactions except for the biomass reaction
-    ex_rxns = [rxn for rxn in model.reactions if "EX_" in rxn.id and "biomass" not in rxn.id]
+    ex_rxns = [rxn for rxn in model.reactions if rxn.id.startswith("EX_") and "biomass" not in rxn.id]
     model.remove_reactions(ex_rxns)
 
-    # Step 2: Tag metabolites in intra- and extracellular compartments of model
-    for rxn in model.reactions:
-        # Change the intracellualr reaction from [c] --> [c]
-        if "[e]" in rxn.reaction or "[c]" in rxn.reaction:
-            rxn.id = f'{short_microbe_name}_{rxn.id}'
-            # tag each metabolite in rxn, if not already tagged
-            for met in rxn.metabolites:
-                if ("[c]" in met.id or "[p]" in met.id) and short_microbe_name not in met.id:
-                    compartment = 'c' if '[c]' in met.id else 'p'
-                    tag_metabolite(met, short_microbe_name, compartment)
-                elif "[e]" in met.id and short_microbe_name not in met.id:
-                    met.compartment = "u"
-                    no_c_name = met.id.replace("[e]", "")
-                    met.id = f'{short_microbe_name}_{no_c_name}[u]'
+    # Step 2: Tag all reactions and metabolites with the microbe name in a single pass
+    # [c] and [p] metabolites keep their compartment, [e] metabolites move to the lumen [u]
+    # (only those taking part in a reaction, so orphan [e] metabolites get no IEX/diet/fecal exchanges)
+    rxn_renames = [(rxn, f"{microbe_prefix}{rxn.id}") for rxn in model.reactions
+                   if not rxn.id.startswith(microbe_prefix)]
+    met_renames = []
+    for met in model.metabolites:
+        if met.id.startswith(microbe_prefix):
+            continue
+        match = _COMPARTMENT_RE.search(met.id)
+        if match is None or (match.group(1) == "e" and not met.reactions):
+            continue
+        compartment = "u" if match.group(1) == "e" else match.group(1)
+        met.compartment = compartment
+        met_renames.append((met, f"{microbe_prefix}{met.id[:match.start()]}[{compartment}]"))
+    bulk_rename(model, rxn_renames, met_renames)
 
     # Step 3: Create inter-microbe metabolite exchange
     model = _create_inter_microbe_exchange(model, short_microbe_name)
 
-    # Step 4: Ensure all components are properly tagged
-    model = _finalize_microbe_tagging(model, short_microbe_name)
-
     return model
 
 def _create_inter_microbe_exchange(model: cobra.Model, microbe_name: str) -> cobra.Model:
@@ -274,45 +316,41 @@ def _create_inter_microbe_exchange(model: cobra.Model, microbe_name: str) -> cob
     Biological Rationale: Allows microbe to contribute/consume shared metabolites
     in community lumen while maintaining microbe-specific uptake kinetics.
     """
+    microbe_prefix = f"{microbe_name}_"
     microbe_lumen_metabolites = [
-        met for met in model.metabolites 
-        if "[u]" in met.id and microbe_name in met.id
+        met for met in model.metabolites
+        if met.id.endswith("[u]") and met.id.startswith(microbe_prefix)
     ]
     
+    mets_by_id = {m.id: m for m in model.metabolites}
+    new_general_mets, new_iex_rxns = [], []
+    prefix_len = len(microbe_prefix)
+    iex_prefix = f"{microbe_name}_IEX"
+
     for microbe_met in microbe_lumen_metabolites:
-        general_met_id = microbe_met.id.replace(f"{microbe_name}_", "")
-        
+        # Every lumen metabolite starts with the microbe prefix, so strip it by slicing
+        general_met_id = microbe_met.id[prefix_len:]
+
         # Create general metabolite if it doesn't exist
-        if general_met_id not in [m.id for m in model.metabolites]:
+        general_met = mets_by_id.get(general_met_id)
+        if general_met is None:
             general_met = Metabolite(
-                general_met_id, 
-                compartment="u", 
+                general_met_id,
+                compartment="u",
                 name=general_met_id.split("[")[0]
             )
-            model.add_metabolites([general_met])
-        
+            new_general_mets.append(general_met)
+            mets_by_id[general_met_id] = general_met
+
         # Create IEX reaction: general_met <=> microbe_met
-        iex_rxn_id = f"{microbe_name}_IEX_{general_met_id}tr"
-        iex_rxn = create_rxn(iex_rxn_id, f"{microbe_name}_IEX", " ", (-1000.0, 1000.0))
-        model.add_reactions([iex_rxn])
-        iex_rxn.reaction = f"{general_met_id} <=> {microbe_met.id}"
-        iex_rxn.bounds = (-1000.0, 1000.0)
-    
-    return model
+        iex_rxn_id = f"{iex_prefix}_{general_met_id}tr"
+        iex_rxn = create_rxn(iex_rxn_id, iex_prefix, " ", (-1000.0, 1000.0))
+        iex_rxn.add_metabolites({general_met: -1, microbe_met: 1})
+        new_iex_rxns.append(iex_rxn)
+
+    model.add_metabolites(new_general_mets)
+    model.add_reactions(new_iex_rxns)
 
-def _finalize_microbe_tagging(model: cobra.Model, microbe_name: str) -> cobra.Model:
-    """Ensure all reactions and metabolites are properly tagged with microbe name."""
-    # Tag any remaining untagged reactions
-    for rxn in model.reactions:
-        if not rxn.id.startswith(microbe_name):
-            rxn.id = f"{microbe_name}_{rxn.id}"
-    
-    # Tag any remaining untagged [c] and [p] metabolites
-    for met in model.metabolites:
-        if ("[c]" in met.id or "[p]" in met.id) and microbe_name not in met.id:
-            compartment = 'c' if '[c]' in met.id else 'p'
-            tag_metabolite(met, microbe_name, compartment)
-    
     return model
 
 def prune_zero_abundance_microbe(model: cobra.Model, zero_abundance_microbe: list[str]) -> cobra.Model:
@@ -329,17 +367,52 @@ def prune_zero_abundance_microbe(model: cobra.Model, zero_abundance_microbe: lis
         Pruned model containing only detected microbe
     """
     print('Pruning metabolites and Reactions from Zero-Abundance microbe in Sample')
-    zero_prefixes = {f"{microbe}_" for microbe in zero_abundance_microbe}
-    metabolites_to_remove = [
-        met for met in model.metabolites 
-        if any(met.id.startswith(prefix) for prefix in zero_prefixes)
-    ]
+    zero_set = set(zero_abundance_microbe)
+    metabolites_to_remove = []
+    if zero_set:
+        for met in model.metabolites:
+            met_id = met.id
+            # Microbe names contain underscores, so look up the ID prefix ending at each '_'
+            idx = met_id.find("_")
+            while idx > 0:
+                if met_id[:idx] in zero_set:
+                    metabolites_to_remove.append(met)
+                    break
+                idx = met_id.find("_", idx + 1)
     # Destructive removal also removes associated reactions automatically
     model.remove_metabolites(metabolites_to_remove, destructive=True)
     print(f"Pruned {len(metabolites_to_remove)} Metabolites")
     return model
 
-def build_global_gem(abundance_df: pd.DataFrame, mod_dir: str) -> tuple:
+def _load_and_reformat(microbe: str, mod_dir: str, as_dict: bool = True) -> tuple:
+    """
+    Loads a single AGORA model and reformats it for the community model. Defined at module
+    level so it can run in worker processes, where the tagged model is returned as a dict
+    (cobra.io.model_to_dict) because plain dicts pickle much faster than cobra objects.
+
+    Reformatted models are cached as JSON in {mod_dir}/.cache, so warm runs skip both the
+    .mat parsing and the tagging. The cache is invalidated when the .mat file is modified,
+    REFORMAT_CACHE_VERSION is bumped or cobra/optlang are upgraded.
+
+    Returns:
+        tuple: ([e] metabolite IDs of the original model, tagged model or its dict representation)
+    """
+    microbe_path = os.path.join(mod_dir, microbe + ".mat")
+    path = cache_path(microbe_path, REFORMAT_CACHE_VERSION, ".json")
+    if os.path.exists(path):
+        with open(path) as f:
+            cached = json.load(f)
+        model_dict = cached["model"]
+        return cached["ex_mets"], model_dict if as_dict else cobra.io.model_from_dict(model_dict)
+
+    model = cobra.io.load_matlab_model(microbe_path)
+    ex_mets = [met.id for met in model.metabolites if met.id.endswith('[e]')]
+    tagged_model = reformat_gem_for_community(model, microbe_path)
+    model_dict = cobra.io.model_to_dict(tagged_model)
+    write_cache(path, lambda f: json.dump({"ex_mets": ex_mets, "model": model_dict}, f))
+    return ex_mets, model_dict if as_dict else tagged_model
+
+def build_global_gem(abundance_df: pd.DataFrame, mod_dir: str, workers: int = 1) -> tuple:
     """
     Loads all microbe found in the abundance table and builds a unified, unpruned community model.
     microbe are combined into a single COBRA model, tagged and merged. Cleans the community as well
@@ -349,6 +422,7 @@ def build_global_gem(abundance_df: pd.DataFrame, mod_dir: str) -> tuple:
     Parameters:
         abundance_df: microbe x samples abundance dataframe.
         mod_dir: path to folder containing AGORA .mat files.
+        workers: number of processes used to load and reformat the microbe models.
 
     Returns:
         tuple: Contains the cleaned global_model, and its associated 
@@ -358,23 +432,30 @@ def build_global_gem(abundance_df: pd.DataFrame, mod_dir: str) -> tuple:
 
     print("Building global community model".center(40, '*'))
     all_microbe = abundance_df.index.tolist()
-    first_path = os.path.join(mod_dir, all_microbe[0] + ".mat")
-    print(f"Added first microbe model: {all_microbe[0]}".center(40, '*'))
-    first_model = cobra.io.load_matlab_model(first_path)
-    # Collect [e] metabolites from first model
     ex_mets = set()
-    ex_mets.update([met.id for met in first_model.metabolites if met.id.endswith('[e]')])
-
-    global_model = reformat_gem_for_community(first_model, microbe_model_name=first_path)
-    for microbe in all_microbe[1:]:
-        microbe_path = os.path.join(mod_dir, microbe + ".mat")
-        model = cobra.io.load_matlab_model(microbe_path)
-        ex_mets.update([met.id for met in model.metabolites if met.id.endswith('[e]')])
-        tagged_model = reformat_gem_for_community(model, microbe_path)
-        # Avoid duplicate reaction IDs
-        existing_rxns = {r.id for r in global_model.reactions}
-        new_rxns = [r for r in tagged_model.reactions if r.id not in existing_rxns]
-        global_model.add_reactions(new_rxns)
+
+    with (ProcessPoolExecutor(max_workers=workers) if workers > 1 else nullcontext()) as executor:
+        # Microbe models are loaded and reformatted in parallel, then merged in order on this process
+        if executor is not None:
+            loaded = executor.map(_load_and_reformat, all_microbe, repeat(mod_dir))
+        else:
+            loaded = (_load_and_reformat(microbe, mod_dir, as_dict=False) for microbe in all_microbe)
+
+        global_model = None
+        for microbe, (microbe_ex_mets, tagged_model) in zip(all_microbe, loaded):
+            # Collect [e] metabolites from every model
+            ex_mets.update(microbe_ex_mets)
+            if isinstance(tagged_model, dict):
+                tagged_model = cobra.io.model_from_dict(tagged_model)
+            if global_model is None:
+                print(f"Added first microbe model: {microbe}".center(40, '*'))
+                global_model = tagged_model
+                # Running set of reaction IDs in the global model, used to avoid duplicate reaction IDs
+                existing_rxns = _id_set(global_model.reactions)
+                continue
+            new_rxns = [r for r in tagged_model.reactions if r.id not in existing_rxns]
+            global_model.add_reactions(new_rxns)
+            existing_rxns.update(r.id for r in new_rxns)
 
     print("Finished adding GEM reconstructions to community".center(40, '*'))
 
@@ -387,7 +468,7 @@ def build_global_gem(abundance_df: pd.DataFrame, mod_dir: str) -> tuple:
     return clean_model, global_C, global_d, global_dsense, global_ctrs, list(sorted(ex_mets))
 
 def build_sample_gem(sample_name: str, global_model: cobra.Model, abundance_df: pd.DataFrame, 
-                       abun_path: str, out_dir: str, global_C=None, global_d=None,
+                       out_dir: str, global_C=None, global_d=None,
                        global_dsense=None, global_ctrs=None) -> str:
     """
     Takes a deep copy of the global model and builds the sample-specific model:
@@ -400,7 +481,6 @@ def build_sample_gem(sample_name: str, global_model: cobra.Model, abundance_df:
         sample_name: column name in abundance_df
         global_model: unpruned community model
         abundance_df: pandas dataframe of abundances
-        abun_path: path to abundance CSV (needed by com_biomass)
         out_dir: directory to save the output model
 
     Returns:
@@ -422,7 +502,8 @@ def build_sample_gem(sample_name: str, global_model: cobra.Model, abundance_df:
 
     # Add a community biomass reaction to the model
     print("Adding community biomass reaction".center(40, '*'))
-    model = com_biomass(model=model, abun_path=abun_path, sample_com=sample_name)
+    sample_abun_frame = sample_abun[sample_abun > ABUNDANCE_THRESHOLD].rename_axis("X").reset_index()
+    model = com_biomass(model=model, abun_df=sample_abun_frame, sample_com=sample_name)
 
     # Prune coupling constraints from the global model (C, dsense, d, ctrs)
     sample_C, sample_d, sample_dsense, sample_ctrs = prune_coupling_constraints_by_microbe(
@@ -430,7 +511,7 @@ def build_sample_gem(sample_name: str, global_model: cobra.Model, abundance_df:
     )
 
     # Ensuring the reversablity fits all compartments
-    for reac in [r for r in model.reactions if "DUt" in r.id or "UFEt" in r.id]:
+    for reac in [r for r in model.reactions if r.id.startswith(("DUt_", "UFEt_"))]:
         reac.lower_bound = 0.
 
     # Setting EX_microbeBiomass[fe] as objective to match MATLAB mgPipe
@@ -444,6 +525,20 @@ def build_sample_gem(sample_name: str, global_model: cobra.Model, abundance_df:
 
     return save_path
 
+def _init_worker(global_template: dict, global_C, global_d, global_dsense, global_ctrs):
+    """
+    ProcessPoolExecutor initializer. Materializes the global model template (cobra.io.model_to_dict)
+    once per worker and keeps it, together with the global coupling matrices, in module globals
+    so they are not pickled per task.
+    """
+    global _worker_global_model, _worker_coupling
+    _worker_global_model = cobra.io.model_from_dict(global_template)
+    _worker_coupling = (global_C, global_d, global_dsense, global_ctrs)
+
+def _build_sample_gem_in_worker(sample_name: str, abundance_df: pd.DataFrame, out_dir: str) -> str:
+    """Runs build_sample_gem against the global model and coupling matrices held by this worker."""
+    return build_sample_gem(sample_name, _worker_global_model, abundance_df, out_dir, *_worker_coupling)
+
 def community_gem_builder(abun_filepath: str, mod_filepath: str, out_filepath: str, workers=1) -> tuple:
     """
     Inspired by mgpipe.m code.
@@ -485,14 +580,30 @@ def community_gem_builder(abun_filepath: str, mod_filepath: str, out_filepath: s
                 name = 'sample_' + name
         clean_samp_names.append(name)
 
-    global_model, global_C, global_d, global_dsense, global_ctrs, ex_mets = build_global_gem(sample_info, mod_filepath)
+    global_model, global_C, global_d, global_dsense, global_ctrs, ex_mets = build_global_gem(sample_info, mod_filepath, workers=workers)
     samples = sample_info.columns.tolist()
 
-    with ProcessPoolExecutor(max_workers=workers) as executor:
-        futures = [executor.submit(build_sample_gem, s, global_model, sample_info, abun_filepath, out_filepath, 
-                                   global_C, global_d, global_dsense, global_ctrs)
-                   for s in samples]
-        for f in tqdm(futures, desc='Building sample GEMs'):
-            f.result()
+    # Skip samples whose community model was already written by a previous run
+    pending = [s for s in samples
+               if not os.path.exists(os.path.join(out_filepath, f"microbiota_model_samp_{s}.mat"))]
+    if len(pending) < len(samples):
+        print(f"Skipping {len(samples) - len(pending)} sample(s) with existing personalized models.")
+    samples = pending
+
+    if workers <= 1:
+        # Build in-process: no pool spawn and no pickling of the global model
+        for s in tqdm(samples, desc='Building sample GEMs'):
+            build_sample_gem(s, global_model, sample_info, out_filepath,
+                             global_C, global_d, global_dsense, global_ctrs)
+    elif samples:
+        # Serialize the global model once to a plain dict template, which is much cheaper to pickle
+        # than the cobra object graph; each worker materializes it a single time in _init_worker
+        global_template = cobra.io.model_to_dict(global_model)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(global_template, global_C, global_d, global_dsense, global_ctrs)) as executor:
+            futures = [executor.submit(_build_sample_gem_in_worker, s, sample_info, out_filepath)
+                       for s in samples]
+            for f in tqdm(as_completed(futures), total=len(futures), desc='Building sample GEMs'):
+                f.result()
     
     return clean_samp_names, sample_info.index.tolist(), ex_mets
\ No newline at end of file
@@ -11,8 +11,9 @@ import cobra
 import numpy as np
 import pandas as pd
 from scipy.io import loadmat
-from scipy.sparse import csr_matrix, vstack, hstack
+from scipy.sparse import csr_matrix, vstack
 from optlang import Constraint, Variable, Objective, Model as OptModel
+from optlang.symbolics import Zero
 from tqdm import tqdm
 
 # Default Coupling Factor (Used in https://doi.org/10.4161/gmic.22370)
@@ -39,7 +40,9 @@ def build_global_coupling_constraints(model: cobra.Model, microbe_list: list[str
     """
     rxn_id_to_index = {r.id: i for i, r in enumerate(model.reactions)}
 
-    all_constraints = []
+    # Each constraint row holds exactly two non-zeros, so C is assembled from (row, col, value)
+    # triplets instead of dense rows spanning every reaction of the community
+    C_rows, C_cols, C_vals = [], [], []
     all_d = []
     all_dsense = []
     all_ctrs = []
@@ -62,28 +65,28 @@ def build_global_coupling_constraints(model: cobra.Model, microbe_list: list[str
             rxn_idx = rxn_id_to_index[rxn.id]
 
             # Create constraint: v_rxn - 400*v_biomass <= 0
-            constraint_row = np.zeros(len(model.reactions))
-            constraint_row[rxn_idx] = 1.0  # coefficient for v_rxn
-            constraint_row[biomass_idx] = -coupling_factor  # coefficient for v_biomass
+            row_idx = len(all_ctrs)
+            C_rows += [row_idx, row_idx]
+            C_cols += [rxn_idx, biomass_idx]
+            C_vals += [1.0, -coupling_factor]  # coefficients for v_rxn and v_biomass
 
-            all_constraints.append(constraint_row)
             all_d.append(0.0)
             all_dsense.append('L')  # <= constraint
             all_ctrs.append(f"slack_{rxn.id}")
 
             # Also add reverse constraint: v_rxn + 400*v_biomass >= 0 (for reversible reactions)
             if rxn.lower_bound < 0:
-                constraint_row_rev = np.zeros(len(model.reactions))
-                constraint_row_rev[rxn_idx] = 1.0
-                constraint_row_rev[biomass_idx] = coupling_factor
+                row_idx = len(all_ctrs)
+                C_rows += [row_idx, row_idx]
+                C_cols += [rxn_idx, biomass_idx]
+                C_vals += [1.0, coupling_factor]
 
-                all_constraints.append(constraint_row_rev)
                 all_d.append(0.0)
                 all_dsense.append('G')
                 all_ctrs.append(f"slack_{rxn.id}_R")
 
-    if all_constraints:
-        C = csr_matrix(np.vstack(all_constraints))
+    if all_ctrs:
+        C = csr_matrix((C_vals, (C_rows, C_cols)), shape=(len(all_ctrs), len(model.reactions)))
         d = np.array(all_d).reshape(-1, 1)
         dsense = np.array(all_dsense, dtype='<U1')
         ctrs = np.array(all_ctrs, dtype=object)
@@ -139,20 +142,21 @@ def prune_coupling_constraints_by_microbe(
                     break
     
     if keep_rows:
-          # Remap columns to match sample-specific model
-        sample_rxn_ids = [r.id for r in sample_model.reactions]
-        global_rxn_ids = [r.id for r in global_model.reactions]
-
-        global_rxn_idx_map = {rid: i for i, rid in enumerate(global_rxn_ids)}
-
-        cols = []
-        for rid in sample_rxn_ids:
-            idx = global_rxn_idx_map.get(rid)
-            if idx is not None:
-                cols.append(global_C[keep_rows, idx])
-            else:
-                cols.append(csr_matrix((len(keep_rows), 1)))
-        pruned_C = hstack(cols)
+        # Slice the kept rows out of the CSR matrix, then remap their columns to the
+        # sample-specific model; reactions missing from the sample (col_map == -1) are dropped
+        col_map = np.full(len(global_model.reactions), -1, dtype=np.int64)
+        for sample_idx, rxn in enumerate(sample_model.reactions):
+            global_idx = global_model.reactions._dict.get(rxn.id)
+            if global_idx is not None:
+                col_map[global_idx] = sample_idx
+
+        kept_C = csr_matrix(global_C)[keep_rows].tocoo()
+        sample_cols = col_map[kept_C.col]
+        in_sample = sample_cols >= 0
+        pruned_C = csr_matrix(
+            (kept_C.data[in_sample], (kept_C.row[in_sample], sample_cols[in_sample])),
+            shape=(len(keep_rows), len(sample_model.reactions))
+        )
         
         pruned_d = global_d[keep_rows, :]
         pruned_dsense = global_dsense[keep_rows]
@@ -165,50 +169,67 @@ def prune_coupling_constraints_by_microbe(
     
     return pruned_C, pruned_d, pruned_dsense, pruned_ctrs
 
-def apply_couple_constraints(model: cobra.Model, model_path: str) -> cobra.Model:
+def apply_couple_constraints(model: cobra.Model, model_path: str = None, coupling_data: dict = None) -> cobra.Model:
     """
     Applies biomass coupling constraints to a cobra model using optlang.
 
     This function reads the pre-calculated coupling matrix (C), right-hand side (d),
-    and sense vector (dsense) from a .mat file, and adds them as linear
-    constraints to the provided cobra model's solver interface.
+    and sense vector (dsense) from a .mat file, or takes them from coupling data
+    already in memory, and adds them as linear constraints to the provided cobra
+    model's solver interface.
 
     Args:
         model (cobra.Model): The cobra model to which constraints will be added.
         model_path (str): Path to the .mat file containing the coupling data.
+            Not read when coupling_data is given.
+        coupling_data (dict, optional): Already loaded coupling data with keys C, d and dsense.
 
     Returns:
         cobra.Model: The model with added coupling constraints.
     """
 
-    data = loadmat(model_path, simplify_cells=True)
-    modelscipy = data["model"]
+    if coupling_data is None:
+        coupling_data = loadmat(model_path, simplify_cells=True)["model"]
 
-    S = csr_matrix(modelscipy['S'])     # stoichiometric matrix
-    C = csr_matrix(modelscipy.get('C', np.empty((0, S.shape[1]))))  # fallback to empty
-    d = modelscipy['d'].reshape(-1, 1).astype(float)
+    C = coupling_data.get('C', csr_matrix((0, len(model.reactions))))  # fallback to empty
+    # Coupling matrices are >99% zeros: sparse input is converted sparse-to-sparse, never densified
+    C_csr = csr_matrix(C)
+    d = np.asarray(coupling_data['d']).reshape(-1, 1).astype(float)
 
-    C_csr = C.tocsr()
-    dsense = modelscipy.get('dsense')
+    dsense = coupling_data.get('dsense')
     
-    forward_vars = np.array([rxn.forward_variable for rxn in model.reactions])
-    reverse_vars = np.array([rxn.reverse_variable for rxn in model.reactions])
-    constraints_to_add = []
+    forward_vars = [rxn.forward_variable for rxn in model.reactions]
+    reverse_vars = [rxn.reverse_variable for rxn in model.reactions]
+    constraints_to_add, row_coefficients = [], []
 
+    # Constraints are created empty and their coefficients are then written straight from the
+    # CSR arrays into the solver, which avoids building a symbolic expression for every row
+    indptr, indices, data = C_csr.indptr, C_csr.indices, C_csr.data
     for i in tqdm(range(C.shape[0])):
-        row = C_csr.getrow(i)
-        if row.nnz == 0:  # Skip empty rows
+        start, end = indptr[i], indptr[i + 1]
+        if start == end:  # Skip empty rows
             continue
-        
-        expr = sum(row.data[k] * (forward_vars[row.indices[k]] - reverse_vars[row.indices[k]]) for k in range(row.nnz))
+
         if dsense[i] == 'E':
-            constraints_to_add.append(Constraint(expr, lb=d[i,0], ub=d[i,0]))
+            bounds = {'lb': d[i,0], 'ub': d[i,0]}
         elif dsense[i] == 'L':
-            constraints_to_add.append(Constraint(expr, ub=d[i,0]))
+            bounds = {'ub': d[i,0]}
         elif dsense[i] == 'G':
-            constraints_to_add.append(Constraint(expr, lb=d[i,0]))
+            bounds = {'lb': d[i,0]}
+        else:
+            continue
+
+        coefficients = {}
+        for j, value in zip(indices[start:end].tolist(), data[start:end].tolist()):
+            coefficients[forward_vars[j]] = value
+            coefficients[reverse_vars[j]] = -value
+        constraints_to_add.append(model.problem.Constraint(Zero, **bounds))
+        row_coefficients.append(coefficients)
 
     model.add_cons_vars(constraints_to_add)
+    model.solver.update()
+    for constraint, coefficients in zip(constraints_to_add, row_coefficients):
+        constraint.set_linear_coefficients(coefficients)
 
     return model
 
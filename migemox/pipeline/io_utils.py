@@ -9,15 +9,75 @@ to improve code organization and reusability.
 import pandas as pd
 import os
 import re
+import hashlib
+import cobra
+import optlang
 from cobra.io import load_matlab_model
 from cobra.util import create_stoichiometric_matrix
 import numpy as np
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, List, Tuple, Optional, Callable, IO
 from pathlib import Path
 import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
-from scipy.sparse import csr_matrix
+from scipy.sparse import csr_matrix, issparse
+
+# Folder (next to the source .mat files) holding cached parses/reformats of those files
+CACHE_DIR = ".cache"
+
+def cache_path(source_path: str, version: int, ext: str) -> str:
+    """
+    Cache file for data derived from source_path, stored as {folder}/.cache/{stem}_{key}{ext}.
+
+    The key covers the caller's cache format version, the cobra and optlang versions (cached
+    objects depend on their internals), the source path and its modification time, so any of
+    these changing yields a cache miss.
+    """
+    folder, file_name = os.path.split(source_path)
+    key_src = f"{version}:{cobra.__version__}:{optlang.__version__}:{source_path}:{os.path.getmtime(source_path)}"
+    key = hashlib.blake2b(key_src.encode(), digest_size=16).hexdigest()
+    return os.path.join(folder, CACHE_DIR, f"{os.path.splitext(file_name)[0]}_{key}{ext}")
+
+def write_cache(path: str, dump: Callable[[IO], None], binary: bool = False):
+    """
+    Atomically writes a cache file created by cache_path, via dump(file), and removes the entries
+    of the same source it supersedes. Failures (e.g. read-only model folders) only log a warning.
+    """
+    cache_dir, file_name = os.path.split(path)
+    stem, ext = os.path.splitext(file_name)
+    source_stem = stem.rsplit("_", 1)[0]
+    stale_re = re.compile(rf"{re.escape(source_stem)}_[0-9a-f]{{32}}{re.escape(ext)}")
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb" if binary else "w") as f:
+            dump(f)
+        os.replace(tmp_path, path)
+        for entry in os.listdir(cache_dir):
+            if entry != file_name and stale_re.fullmatch(entry):
+                os.remove(os.path.join(cache_dir, entry))
+    except OSError as e:
+        logger.warning(f"Could not write cache file {path}: {e}")
+
+def bulk_rename(model: cobra.Model, rxn_renames: list, met_renames: list = ()):
+    """
+    Applies pending (object, new_id) renames to reactions and metabolites in a single sweep.
+    Assigning .id on an object that belongs to a model rebuilds the whole DictList index
+    every time, so the solver names and IDs are updated directly and each index is rebuilt once.
+    """
+    for rxn, new_id in rxn_renames:
+        forward_variable, reverse_variable = rxn.forward_variable, rxn.reverse_variable
+        rxn._id = new_id
+        forward_variable.name = rxn.id
+        reverse_variable.name = rxn.reverse_id
+    for met, new_id in met_renames:
+        model.constraints[met.id].name = new_id
+        met._id = new_id
+    for dictlist, renames in ((model.reactions, rxn_renames), (model.metabolites, met_renames)):
+        if renames:
+            dictlist._generate_index()
+            if len(dictlist._dict) != len(dictlist):
+                raise ValueError(f"Renaming produced duplicate IDs in model {model.id}")
 
 def get_individual_size_name(abun_file_path: str, mod_path: str) -> tuple:
     """
@@ -97,8 +157,9 @@ def make_community_gem_dict(model, C=None, d=None, dsense=None, ctrs=None):
             c[i, 0] = 1.0
             break
 
-    # S matrix
-    S = create_stoichiometric_matrix(model)
+    # S matrix, kept sparse as in COBRA Toolbox models. A dense S is hundreds of MB for community
+    # models and dominated the (zlib-compressed) savemat time, while sparse S compresses almost for free
+    S = create_stoichiometric_matrix(model, array_type='dok').tocsc()
 
     # Bounds
     lb = np.array([rxn.lower_bound for rxn in model.reactions], dtype=np.float64).reshape(-1, 1)
@@ -119,10 +180,8 @@ def make_community_gem_dict(model, C=None, d=None, dsense=None, ctrs=None):
     if dsense is None: dsense = np.array([], dtype='<U1')
     if ctrs is None: ctrs = np.array([], dtype=object).reshape(-1, 1)
 
-    C = csr_matrix((0, num_rxns)) if C is None else C
-    d = np.zeros((0, 1)) if d is None else d
-    dsense = np.array([], dtype='<U1') if dsense is None else dsense
-    ctrs = np.array([], dtype=object).reshape(-1, 1) if ctrs is None else ctrs.reshape(-1, 1)
+    C = C if issparse(C) else csr_matrix(C)
+    ctrs = ctrs.reshape(-1, 1)
 
     # Model name
     model_name = np.array([model.name], dtype=object)
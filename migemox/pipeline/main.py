@@ -24,7 +24,7 @@ from datetime import datetime, timezone
 def run_migemox_pipeline(abun_filepath: str, mod_filepath: str, diet_filepath: str,
                          res_filepath: str = 'Results', workers: int = 1, solver: str = 'cplex',
                          biomass_bounds: tuple = (0.4, 1.0), contr_filepath: str = 'Contributions',
-                         analyze_contributions: bool = False, fresh_start: bool = False
+                         analyze_contributions: bool = False, fresh_start: bool = False,
                          use_net_production_dict: bool = False):
     """
     Main function to run the MiGEMox pipeline.
@@ -58,7 +58,7 @@ def run_migemox_pipeline(abun_filepath: str, mod_filepath: str, diet_filepath: s
     print("\n--- Stage 2: Adapting Diet and Running Simulations ---")
 
     # 3. Simulate Microbiota Models
-    exchanges, net_production, net_uptake, min_net_fecal_excretion, raw_fva_results = run_community_fva(
+    exchanges, net_production, net_uptake, min_net_fecal_excretion, raw_fva_path = run_community_fva(
         sample_names=clean_samp_names,
         ex_mets=ex_mets,
         model_dir=f'{res_filepath}/Personalized_Models',
@@ -66,7 +66,7 @@ def run_migemox_pipeline(abun_filepath: str, mod_filepath: str, diet_filepath: s
         res_path=res_filepath,
         biomass_bounds=biomass_bounds,
         solver=solver,
-        workers=2
+        workers=workers
     )
 
     # 4. Collect Flux Profiles and Save
@@ -80,9 +80,7 @@ def run_migemox_pipeline(abun_filepath: str, mod_filepath: str, diet_filepath: s
         res_path=res_filepath
     )
     pd.DataFrame(min_net_fecal_excretion).to_csv(Path(res_filepath) / 'inputDiet_min_net_fecal_excretion.csv')
-    raw_fva_df = pd.concat({k: pd.DataFrame(v).T for k, v in raw_fva_results.items()}, axis=0)
-    raw_fva_df.index.names = ['Sample', 'Reaction']
-    raw_fva_df.to_csv(Path(res_filepath) / 'inputDiet_raw_fva_results.csv')
+    # Raw FVA results were already written sample by sample during the simulations
     
     print(f"Net secretion and uptake results saved to {res_filepath}.")
 
@@ -151,7 +149,7 @@ if __name__ == "__main__":
         workers=args.workers,
         solver=args.solver,
         biomass_bounds=biomass_bounds_tuple,
-        analyze_contributions=args.analyze_contributions
-        use_net_production_dict=args.use_net_production_dict
+        analyze_contributions=args.analyze_contributions,
+        use_net_production_dict=args.use_net_production_dict,
         fresh_start=args.fresh_start
     )